@@ -36,6 +36,8 @@ else:
 
 IMAGE_SIZE = 640
 DEVICE = "cuda" if os.getenv("CUDA_AVAILABLE", "false").lower() == "true" else "cpu"
+# Serve a TensorRT (GPU) / OpenVINO (CPU) export of the weights; needs requirements-export.txt
+OPTIMIZED_INFERENCE = os.getenv("OPTIMIZED_INFERENCE", "false").lower() == "true"
 
 # Data paths
 DATA_YAML_PATH = DATASET_DIR / "data.yaml"
@@ -46,6 +48,11 @@ SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY", "")
 
+# LLM response cache (persists advice across restarts)
+LLM_CACHE_DIR = PROJECT_ROOT / ".llm_cache"
+LLM_CACHE_SIZE_LIMIT = 100_000_000  # bytes
+LLM_CACHE_EXPIRE = 7 * 86400  # seconds
+
 # Health scoring configuration
 CONFIDENCE_THRESHOLD = 0.25
 DISEASE_IMPACT_WEIGHTS = {
@@ -2,6 +2,7 @@
 Simplified FastAPI Backend for Crop Health Monitoring
 """
 
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Optional
@@ -117,6 +118,15 @@ async def startup_event():
         logger.warning("PlantNet API key not configured")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled HTTP connections"""
+    await plantnet_api.close_async()
+    plantnet_api.close()
+    await rag_agent.close_async()
+    rag_agent.close()
+
+
 # Health check
 @app.get("/health")
 async def health_check():
@@ -149,6 +159,53 @@ async def health_check():
     }
 
 
+async def _detect_diseases(pil_image: Image.Image) -> List[DetectionResult]:
+    """Run YOLO disease detection off the event loop"""
+    if not yolo_inference:
+        return []
+    
+    detection_results = await yolo_inference.predict_async(pil_image)
+    return [
+        DetectionResult(
+            class_name=detection['class_name'],
+            confidence=detection['confidence'],
+            bbox=detection['bbox'],
+            area=detection['area']
+        )
+        for detection in detection_results
+    ]
+
+
+async def _identify_plant(image_data: bytes, include_plant_id: bool) -> Optional[PlantIdentificationModel]:
+    """Identify the plant species with PlantNet"""
+    if not (include_plant_id and plantnet_api.api_key):
+        return None
+    
+    try:
+        logger.info("Starting plant identification...")
+        plant_result = await plantnet_api.identify_plant_async(image_data, organs=["auto"])  # Changed from ["leaf"] to ["auto"]
+        
+        if plant_result and plant_result.get('success', False) and plant_result.get('best_match'):
+            best_match = plant_result['best_match']
+            logger.info(f"Plant identified: {best_match['primary_common_name']} (confidence: {best_match['confidence']})")
+            return PlantIdentificationModel(
+                scientific_name=best_match['scientific_name'],
+                common_names=best_match['common_names'],
+                primary_common_name=best_match['primary_common_name'],
+                family=best_match['family'],
+                genus=best_match['genus'],
+                score=best_match['score'],
+                confidence=best_match['confidence']
+            )
+        
+        logger.warning("Plant identification returned no valid results")
+            
+    except Exception as e:
+        logger.warning(f"Plant identification failed: {e}")
+    
+    return None
+
+
 # Main prediction endpoint
 @app.post("/predict", response_model=HealthResponse)
 async def predict_crop_health(
@@ -178,45 +235,11 @@ async def predict_crop_health(
             except Exception as e:
                 logger.warning(f"Invalid sensor data: {e}")
         
-        # Run disease detection
-        detections = []
-        if yolo_inference:
-            detection_results = yolo_inference.predict(pil_image)
-            
-            for detection in detection_results:
-                det_obj = DetectionResult(
-                    class_name=detection['class_name'],
-                    confidence=detection['confidence'],
-                    bbox=detection['bbox'],
-                    area=detection['area']
-                )
-                detections.append(det_obj)
-        
-        # Run plant identification
-        plant_identification = None
-        if include_plant_id and plantnet_api.api_key:
-            try:
-                logger.info("Starting plant identification...")
-                plant_result = plantnet_api.identify_plant(image_data, organs=["auto"])  # Changed from ["leaf"] to ["auto"]
-                
-                if plant_result and plant_result.get('success', False) and plant_result.get('best_match'):
-                    best_match = plant_result['best_match']
-                    plant_identification = PlantIdentificationModel(
-                        scientific_name=best_match['scientific_name'],
-                        common_names=best_match['common_names'],
-                        primary_common_name=best_match['primary_common_name'],
-                        family=best_match['family'],
-                        genus=best_match['genus'],
-                        score=best_match['score'],
-                        confidence=best_match['confidence']
-                    )
-                    logger.info(f"Plant identified: {best_match['primary_common_name']} (confidence: {best_match['confidence']})")
-                else:
-                    logger.warning("Plant identification returned no valid results")
-                    
-            except Exception as e:
-                logger.warning(f"Plant identification failed: {e}")
-
+        # Run disease detection and plant identification concurrently
+        detections, plant_identification = await asyncio.gather(
+            _detect_diseases(pil_image),
+            _identify_plant(image_data, include_plant_id)
+        )
         
         # Calculate health score
         health_assessment = health_scorer.calculate_health_score(
@@ -284,7 +307,7 @@ async def identify_plant_species(
         logger.info(f"Identifying plant with organs: {organ_list}")
         
         # Identify plant
-        result = plantnet_api.identify_plant(
+        result = await plantnet_api.identify_plant_async(
             image_data, 
             organs=organ_list,
             nb_results=nb_results
@@ -360,16 +383,22 @@ async def get_farming_advice(prediction_id: str):
             'confidence': plant_identification.confidence
         }
     
-    # Get enhanced advice for primary disease
+    # Get enhanced advice for every detected disease in one batch, primary disease first
     if health_assessment.detected_issues:
-        primary_disease = health_assessment.detected_issues[0]['class_name']
-        enhanced_advice = rag_agent.get_disease_advice(primary_disease)
+        disease_names = list(dict.fromkeys(issue['class_name'] for issue in health_assessment.detected_issues))
+        advice_batch = await rag_agent.get_disease_advice_batch_async(disease_names)
         
-        advice['enhanced_advice'] = {
-            'disease': enhanced_advice['disease_name'],
-            'detailed_summary': enhanced_advice['summary'],
-            'confidence': enhanced_advice['confidence']
-        }
+        enhanced_advice = [
+            {
+                'disease': disease_advice['disease_name'],
+                'detailed_summary': disease_advice['summary'],
+                'confidence': disease_advice['confidence']
+            }
+            for disease_advice in advice_batch
+        ]
+        advice['enhanced_advice'] = enhanced_advice[0]
+        if len(enhanced_advice) > 1:
+            advice['additional_advice'] = enhanced_advice[1:]
     
     return advice
 
@@ -379,7 +408,7 @@ async def get_farming_advice(prediction_id: str):
 async def get_disease_advice(disease_name: str):
     """Get advice for specific disease"""
     try:
-        advice = rag_agent.get_disease_advice(disease_name)
+        advice = await rag_agent.get_disease_advice_async(disease_name)
         return advice
     except Exception as e:
         logger.error(f"Disease advice error: {e}")
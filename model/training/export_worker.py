@@ -0,0 +1,12 @@
+"""
+Export worker for parallel YOLO model exports
+Kept free of import-time side effects so spawned processes load only Ultralytics
+"""
+
+from ultralytics import YOLO
+
+
+def export_one(model_path: str, format_type: str, device: str) -> str:
+    """Export a single format in a worker process (each loads its own model and device context)"""
+    model = YOLO(model_path)
+    return str(model.export(format=format_type, device=device))
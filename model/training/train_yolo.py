@@ -17,12 +17,16 @@ from tqdm import tqdm
 import time
 import argparse
 import glob
+import multiprocessing
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 torch.backends.cudnn.benchmark = True
 
 from config import (
     DATASET_DIR, MODELS_DIR, YOLO_MODEL_SIZE, 
     IMAGE_SIZE, BATCH_SIZE, EPOCHS, DEVICE, TRAINING_CONFIG
 )
+from export_worker import export_one
 
 # Enhanced GPU detection and configuration
 def detect_device():
@@ -88,6 +92,10 @@ def on_train_epoch_end(trainer):
         logger.warning(f"Epoch callback error: {e}")
 
 
+# Export formats Ultralytics builds from an intermediate <weights>.onnx (openvino does on 8.0.x)
+_ONNX_DERIVED_FORMATS = {'engine', 'openvino', 'saved_model', 'pb', 'tflite', 'edgetpu', 'tfjs'}
+
+
 class YOLOTrainer:
     """YOLOv8 model trainer optimized for YOLOv8m"""
     
@@ -105,6 +113,9 @@ class YOLOTrainer:
         # Use detected device
         self.device = DETECTED_DEVICE
         
+        # Loaded (and compiled) evaluation models, keyed by weights path
+        self._eval_models = {}
+        
         # Resume configuration
         self.resume_from = resume_from
         self.last_checkpoint = self._find_last_checkpoint() if resume_from else None
@@ -352,6 +363,13 @@ class YOLOTrainer:
             logger.error(f"Training failed: {e}")
             raise
     
+    def _get_eval_model(self, model_path: Path) -> YOLO:
+        """Load a model for evaluation, cached per path"""
+        key = str(model_path)
+        if key not in self._eval_models:
+            self._eval_models[key] = YOLO(key)
+        return self._eval_models[key]
+    
     def validate_model(self, model_path: Path) -> dict:
         """Validate trained model with progress tracking"""
         try:
@@ -359,7 +377,7 @@ class YOLOTrainer:
                 logger.info(f"Validating model: {model_path}")
                 pbar.set_postfix({"status": "loading model"})
                 
-                model = YOLO(str(model_path))
+                model = self._get_eval_model(model_path)
                 pbar.update(1)
                 
                 pbar.set_postfix({"status": "running validation"})
@@ -402,7 +420,7 @@ class YOLOTrainer:
             with tqdm(desc="📊 Comprehensive Evaluation", unit="step", total=6) as pbar:
                 # Load model
                 pbar.set_postfix({"status": "loading model"})
-                model = YOLO(str(model_path))
+                model = self._get_eval_model(model_path)
                 pbar.update(1)
                 
                 # Basic validation metrics
@@ -523,6 +541,7 @@ class YOLOTrainer:
     def _analyze_model_size(self, model_path: Path) -> dict:
         """Analyze model size and parameters"""
         try:
+            # Fresh load: cached eval models were fused in place by val(), which changes parameter counts
             model = YOLO(str(model_path))
             
             # File size
@@ -580,7 +599,7 @@ class YOLOTrainer:
             logger.warning(f"Failed to save evaluation report: {e}")
     
     def export_model(self, model_path: Path, formats: list = None) -> dict:
-        """Export model to different formats with progress tracking"""
+        """Export model to different formats in parallel with progress tracking"""
         if formats is None:
             formats = ['onnx', 'torchscript']
         
@@ -589,17 +608,26 @@ class YOLOTrainer:
             
             with tqdm(desc="📤 Exporting model", total=len(formats), unit="format") as pbar:
                 logger.info(f"Exporting model to formats: {formats}")
-                model = YOLO(str(model_path))
                 
-                for format_type in formats:
-                    try:
-                        pbar.set_postfix({"current": format_type})
-                        export_path = model.export(format=format_type, device=self.device)
-                        exported_paths[format_type] = export_path
-                        logger.info(f"Exported {format_type}: {export_path}")
-                        pbar.update(1)
-                    except Exception as e:
-                        logger.warning(f"Failed to export {format_type}: {e}")
+                # Exporters are CPU-bound and independent, so run one per process.
+                # Spawn avoids inheriting the parent's initialized CUDA context.
+                with ProcessPoolExecutor(max_workers=len(formats),
+                                         mp_context=multiprocessing.get_context('spawn')) as executor:
+                    futures = {
+                        executor.submit(export_one, self._export_source(model_path, format_type),
+                                        format_type, self.device): format_type
+                        for format_type in formats
+                    }
+                    
+                    for future in as_completed(futures):
+                        format_type = futures[future]
+                        try:
+                            export_path = future.result()
+                            exported_paths[format_type] = export_path
+                            logger.info(f"Exported {format_type}: {export_path}")
+                        except Exception as e:
+                            logger.warning(f"Failed to export {format_type}: {e}")
+                        pbar.set_postfix({"last": format_type})
                         pbar.update(1)
             
             return exported_paths
@@ -608,6 +636,18 @@ class YOLOTrainer:
             logger.error(f"Export failed: {e}")
             return {}
     
+    @staticmethod
+    def _export_source(model_path: Path, format_type: str) -> str:
+        """Weights to export from; ONNX-derived formats use a private copy so their intermediate .onnx stays separate"""
+        if format_type not in _ONNX_DERIVED_FORMATS:
+            return str(model_path)
+        
+        export_dir = model_path.parent / f"{format_type}_export"
+        export_dir.mkdir(exist_ok=True)
+        source = export_dir / model_path.name
+        shutil.copy2(model_path, source)
+        return str(source)
+    
     def _save_training_summary(self, experiment_dir: Path, results) -> None:
         """Save training summary and metrics"""
         try:
@@ -736,7 +776,10 @@ def main():
         
         # Export model
         logger.info("Exporting model...")
-        exported = trainer.export_model(best_model_path, formats=['onnx'])
+        export_formats = ['onnx', 'openvino']
+        if DETECTED_DEVICE == 'cuda':
+            export_formats.append('engine')  # TensorRT requires a GPU
+        exported = trainer.export_model(best_model_path, formats=export_formats)
         
         # Print final summary
         print("\n🎉 YOLOv8m TRAINING COMPLETED!")
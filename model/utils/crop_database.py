@@ -3,14 +3,27 @@ Comprehensive Crop Database
 Maps diseases, pests, and crop-specific information for robust health assessment
 """
 
-from typing import Dict, List, Tuple, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 import yaml
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Most distinct crop names whose optimal ranges each CropDatabase keeps
+_RANGES_CACHE_SIZE = 256
+
+# Default ranges used when a crop is not in the database
+_DEFAULT_RANGES: Mapping[str, Tuple[float, float]] = MappingProxyType({
+    "temperature": (18, 25),
+    "humidity": (50, 70),
+    "ph": (6.0, 7.0),
+    "soil_moisture": (60, 80)
+})
+
 
 class DiseaseType(Enum):
     FUNGAL = "fungal"
@@ -28,7 +41,7 @@ class SeverityLevel(Enum):
     CRITICAL = "critical"
 
 
-@dataclass
+@dataclass(kw_only=True, slots=True)
 class DiseaseInfo:
     """Comprehensive disease information"""
     name: str
@@ -42,7 +55,7 @@ class DiseaseInfo:
     environmental_factors: List[str]
 
 
-@dataclass
+@dataclass(kw_only=True, slots=True)
 class CropInfo:
     """Crop-specific information"""
     name: str
@@ -63,6 +76,9 @@ class CropDatabase:
         self.diseases = self._initialize_disease_database()
         self.crops = self._initialize_crop_database()
         self.class_mappings = self._load_class_mappings()
+        
+        # Read-only optimal ranges already built, keyed by crop name
+        self._ranges_cache: Dict[str, Mapping[str, Tuple[float, float]]] = {}
     
     def _initialize_disease_database(self) -> Dict[str, DiseaseInfo]:
         """Initialize comprehensive disease database"""
@@ -279,24 +295,28 @@ class CropDatabase:
         
         return None
     
-    def get_crop_specific_ranges(self, crop_name: str) -> Dict[str, Tuple[float, float]]:
-        """Get crop-specific optimal ranges"""
+    def get_crop_specific_ranges(self, crop_name: str) -> Mapping[str, Tuple[float, float]]:
+        """Get crop-specific optimal ranges (cached per crop name, read-only)"""
+        ranges = self._ranges_cache.get(crop_name)
+        if ranges is not None:
+            return ranges
+        
         crop_info = self.get_crop_info(crop_name)
         if crop_info:
-            return {
+            ranges = MappingProxyType({
                 "temperature": crop_info.optimal_temp_range,
                 "humidity": crop_info.optimal_humidity_range,
                 "ph": crop_info.optimal_ph_range,
                 "soil_moisture": crop_info.optimal_moisture_range
-            }
+            })
+        else:
+            # Default ranges if crop not found
+            ranges = _DEFAULT_RANGES
         
-        # Default ranges if crop not found
-        return {
-            "temperature": (18, 25),
-            "humidity": (50, 70),
-            "ph": (6.0, 7.0),
-            "soil_moisture": (60, 80)
-        }
+        # Crop names come from requests, so keep the cache bounded
+        if len(self._ranges_cache) < _RANGES_CACHE_SIZE:
+            self._ranges_cache[crop_name] = ranges
+        return ranges
     
     def _get_severity_from_impact(self, impact_score: float) -> SeverityLevel:
         """Convert impact score to severity level"""
@@ -348,3 +368,9 @@ class CropDatabase:
             recommendations.append("Monitor surrounding plants closely - rapid spread possible")
         
         return recommendations
+
+
+@lru_cache(maxsize=1)
+def get_crop_database() -> CropDatabase:
+    """Return the process-wide CropDatabase, built on first use"""
+    return CropDatabase()
@@ -4,16 +4,27 @@ Combines multiple YOLO datasets into a single unified dataset
 """
 
 import os
+import re
 import shutil
 import yaml
+import numpy as np
 from pathlib import Path
 from collections import defaultdict
 import logging
 from typing import Dict, List, Tuple, Set
 import hashlib
+import json
+
+# Prefer the libyaml-backed dumper when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeDumper as _YamlDumper
 
 DATASET_DIR = Path(__file__).parent.parent / "dataset" / "dataset"
 DATA_DIR = Path(__file__).parent.parent / "data"
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'bmp'}
+CLASS_ID_PATTERN = re.compile(r'^\s*(\d+)', re.MULTILINE)
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,12 +43,12 @@ class DatasetMerger:
     def scan_datasets(self) -> List[Path]:
         """Scan for all dataset directories containing data.yaml files"""
         datasets = []
-        for item in self.source_dir.iterdir():
-            if item.is_dir():
-                yaml_file = item / "data.yaml"
-                if yaml_file.exists():
-                    datasets.append(item)
-                    logger.info(f"Found dataset: {item.name}")
+        # os.scandir reuses the d_type from readdir, avoiding a stat per entry
+        with os.scandir(self.source_dir) as entries:
+            for entry in entries:
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, "data.yaml")):
+                    datasets.append(Path(entry.path))
+                    logger.info(f"Found dataset: {entry.name}")
         return datasets
     
     def load_dataset_config(self, dataset_path: Path) -> Dict:
@@ -129,30 +140,59 @@ class DatasetMerger:
                     continue
                 
                 # Process images
-                for img_file in source_images.glob('*'):
-                    if img_file.suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp']:
+                with os.scandir(source_images) as entries:
+                    for entry in entries:
+                        stem, dot, ext = entry.name.rpartition('.')
+                        if not dot or ext.lower() not in IMAGE_EXTENSIONS:
+                            continue
+                        
                         # Create unique filename to avoid conflicts - consistent naming
-                        new_stem = f"{dataset_name}_{img_file.stem}"
-                        new_name = f"{new_stem}{img_file.suffix}"
+                        new_stem = f"{dataset_name}_{stem}"
+                        new_name = f"{new_stem}.{ext}"
                         dest_img = images_dir / new_name
                         
                         # Copy image
-                        shutil.copy2(img_file, dest_img)
+                        shutil.copy2(entry.path, dest_img)
                         
                         # Process corresponding label with matching filename
-                        label_file = source_labels / f"{img_file.stem}.txt"
+                        label_file = source_labels / f"{stem}.txt"
                         if label_file.exists():
                             # Use the same stem as the image file
                             dest_label = labels_dir / f"{new_stem}.txt"
                             self._process_label_file(label_file, dest_label, dataset_name)
                         else:
-                            logger.warning(f"No label file found for {img_file.name} in {dataset_name}")
+                            logger.warning(f"No label file found for {entry.name} in {dataset_name}")
                         
                         split_count += 1
             
             self.dataset_stats[f"{split}_images"] = split_count
             logger.info(f"Processed {split_count} images for {split} split")
     
+    def compute_class_statistics(self) -> None:
+        """Count label instances per unified class for each split"""
+        num_classes = len(self.unified_classes)
+        
+        for split in ['train', 'valid', 'test']:
+            labels_dir = self.output_dir / split / 'labels'
+            if not labels_dir.exists():
+                continue
+            
+            # Concatenate all labels and histogram the class column in one pass
+            chunks = []
+            with os.scandir(labels_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.txt'):
+                        with open(entry.path, 'r') as f:
+                            chunks.append(f.read())
+            
+            class_ids = np.array(CLASS_ID_PATTERN.findall('\n'.join(chunks)), dtype=np.int64)
+            counts = np.bincount(class_ids, minlength=num_classes)
+            
+            self.dataset_stats[f"{split}_class_counts"] = {
+                name: int(count) for name, count in zip(self.unified_classes, counts)
+            }
+            logger.info(f"Counted {int(counts.sum())} labels across {num_classes} classes for {split} split")
+    
     def _process_label_file(self, source_label: Path, dest_label: Path, dataset_name: str) -> None:
         """Process label file and update class IDs according to unified mapping"""
         try:
@@ -190,17 +230,20 @@ class DatasetMerger:
     def create_unified_yaml(self) -> None:
         """Create unified data.yaml configuration file"""
         # Use absolute paths to avoid path resolution issues
-        config = {
-            'train': str(self.output_dir / 'train' / 'images'),
-            'val': str(self.output_dir / 'valid' / 'images'),
-            'test': str(self.output_dir / 'test' / 'images'),
-            'nc': len(self.unified_classes),
-            'names': self.unified_classes
-        }
+        train_dir = str(self.output_dir / 'train' / 'images')
+        val_dir = str(self.output_dir / 'valid' / 'images')
+        test_dir = str(self.output_dir / 'test' / 'images')
         
+        # Fixed layout, so write it directly; JSON scalars/lists are valid YAML flow style
         yaml_file = self.output_dir / 'data.yaml'
         with open(yaml_file, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+            f.write(
+                f"train: {json.dumps(train_dir)}\n"
+                f"val: {json.dumps(val_dir)}\n"
+                f"test: {json.dumps(test_dir)}\n"
+                f"nc: {len(self.unified_classes)}\n"
+                f"names: {json.dumps(self.unified_classes)}\n"
+            )
         
         logger.info(f"Created unified data.yaml with {len(self.unified_classes)} classes")
     
@@ -214,7 +257,7 @@ class DatasetMerger:
         }
         
         with open(mapping_file, 'w') as f:
-            yaml.dump(mapping_data, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(mapping_data, f, Dumper=_YamlDumper, default_flow_style=False, sort_keys=False)
         
         logger.info(f"Saved class mapping to {mapping_file}")
     
@@ -240,6 +283,9 @@ class DatasetMerger:
             # Copy and process images/labels
             self.copy_images_and_labels(datasets)
             
+            # Per-class label statistics (useful for class weighting)
+            self.compute_class_statistics()
+            
             # Create configuration files
             self.create_unified_yaml()
             self.save_class_mapping()
@@ -249,7 +295,8 @@ class DatasetMerger:
             logger.info(f"Source datasets: {len(datasets)}")
             logger.info(f"Unified classes: {len(self.unified_classes)}")
             for key, value in self.dataset_stats.items():
-                logger.info(f"{key}: {value}")
+                if not key.endswith('_class_counts'):
+                    logger.info(f"{key}: {value}")
             
             logger.info("Dataset merge completed successfully!")
             return True
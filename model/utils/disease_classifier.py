@@ -2,27 +2,30 @@
 Disease Classification and Severity Assessment
 """
 
-import yaml
 import logging
 import json
-from typing import Dict, List, Optional
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
 from pathlib import Path
-from dataclasses import dataclass
-from enum import Enum
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
 
 from config import DATA_YAML_PATH
 
 logger = logging.getLogger(__name__)
 
 
-class SeverityLevel(Enum):
+class SeverityLevel:
+    """Severity levels (plain string constants)"""
     LOW = "low"
     MEDIUM = "medium" 
     HIGH = "high"
     CRITICAL = "critical"
 
 
-class DiseaseType(Enum):
+class DiseaseType:
+    """Disease types (plain string constants)"""
     FUNGAL = "fungal"
     BACTERIAL = "bacterial"
     VIRAL = "viral"
@@ -31,32 +34,251 @@ class DiseaseType(Enum):
     ENVIRONMENTAL = "environmental"
 
 
-@dataclass
+@dataclass(slots=True)
 class DiseaseInfo:
     name: str
-    type: DiseaseType
-    severity: SeverityLevel
+    type: str  # one of DiseaseType
+    severity: str  # one of SeverityLevel
     impact_score: float
     spreading_rate: str  # slow, medium, fast
     treatment_priority: int  # 1-5
+    # Resolved once so classify_detection only copies and fills two fields
+    template: Dict = field(init=False, repr=False, compare=False)
+    recommendations: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.template = {
+            'class_name': self.name,
+            'type': self.type,
+            'severity': self.severity,
+            'impact_score': float(self.impact_score),
+            'confidence': 0.0,
+            'treatment_priority': self.treatment_priority,
+            'spreading_rate': self.spreading_rate,
+            'weighted_impact': 0.0
+        }
+        self.recommendations = _recommendations_for(self)
+
+
+def _recommendations_for(disease_info: DiseaseInfo) -> Tuple[str, ...]:
+    """Derive treatment recommendations from disease type and severity"""
+    recommendations = []
+    
+    if disease_info.type == DiseaseType.FUNGAL:
+        recommendations.extend([
+            "Apply appropriate fungicide treatment",
+            "Improve air circulation around plants",
+            "Avoid overhead watering"
+        ])
+    elif disease_info.type == DiseaseType.BACTERIAL:
+        recommendations.extend([
+            "Remove and destroy infected plant material",
+            "Apply copper-based bactericide if available",
+            "Avoid working with wet plants"
+        ])
+    elif disease_info.type == DiseaseType.VIRAL:
+        recommendations.extend([
+            "Remove infected plants to prevent spread",
+            "Control insect vectors",
+            "Use virus-free planting material"
+        ])
+    elif disease_info.type == DiseaseType.PEST:
+        recommendations.extend([
+            "Apply appropriate insecticide or miticide",
+            "Use biological control methods if available",
+            "Monitor pest population regularly"
+        ])
+    
+    if disease_info.severity in (SeverityLevel.HIGH, SeverityLevel.CRITICAL):
+        recommendations.insert(0, "URGENT: Take immediate action")
+    
+    return tuple(recommendations)
+
+
+# Severity and characteristics for consolidated classes
+_CONSOLIDATED_DISEASE_INFO = {
+    'healthy': {
+        'type': DiseaseType.ENVIRONMENTAL,
+        'severity': SeverityLevel.LOW,
+        'impact_score': 0.0,
+        'priority': 1,
+        'spreading_rate': 'none'
+    },
+    'blight': {
+        'type': DiseaseType.FUNGAL,
+        'severity': SeverityLevel.HIGH,
+        'impact_score': 85.0,
+        'priority': 5,
+        'spreading_rate': 'fast'
+    },
+    'leaf_spot': {
+        'type': DiseaseType.FUNGAL,
+        'severity': SeverityLevel.MEDIUM,
+        'impact_score': 60.0,
+        'priority': 3,
+        'spreading_rate': 'medium'
+    },
+    'rust': {
+        'type': DiseaseType.FUNGAL,
+        'severity': SeverityLevel.MEDIUM,
+        'impact_score': 65.0,
+        'priority': 3,
+        'spreading_rate': 'medium'
+    },
+    'mildew': {
+        'type': DiseaseType.FUNGAL,
+        'severity': SeverityLevel.MEDIUM,
+        'impact_score': 55.0,
+        'priority': 3,
+        'spreading_rate': 'medium'
+    },
+    'virus_disease': {
+        'type': DiseaseType.VIRAL,
+        'severity': SeverityLevel.HIGH,
+        'impact_score': 80.0,
+        'priority': 4,
+        'spreading_rate': 'fast'
+    },
+    'anthracnose': {
+        'type': DiseaseType.FUNGAL,
+        'severity': SeverityLevel.MEDIUM,
+        'impact_score': 65.0,
+        'priority': 3,
+        'spreading_rate': 'medium'
+    },
+    'rot_disease': {
+        'type': DiseaseType.FUNGAL,
+        'severity': SeverityLevel.HIGH,
+        'impact_score': 75.0,
+        'priority': 4,
+        'spreading_rate': 'medium'
+    },
+    'scab': {
+        'type': DiseaseType.FUNGAL,
+        'severity': SeverityLevel.MEDIUM,
+        'impact_score': 50.0,
+        'priority': 2,
+        'spreading_rate': 'slow'
+    },
+    'pest_damage': {
+        'type': DiseaseType.PEST,
+        'severity': SeverityLevel.MEDIUM,
+        'impact_score': 55.0,
+        'priority': 3,
+        'spreading_rate': 'medium'
+    },
+    'bacterial_disease': {
+        'type': DiseaseType.BACTERIAL,
+        'severity': SeverityLevel.HIGH,
+        'impact_score': 70.0,
+        'priority': 4,
+        'spreading_rate': 'fast'
+    }
+}
+
+# Keywords that mark an unknown class as high severity
+_HIGH_SEVERITY_PATTERN = re.compile(r'critical|severe|wilt|death|dead')
+
+# Classification result for classes missing from the database
+_UNKNOWN_TEMPLATE = {
+    'class_name': '',
+    'type': 'unknown',
+    'severity': 'unknown',
+    'impact_score': 50.0,
+    'confidence': 0.0,
+    'treatment_priority': 2,
+    'weighted_impact': 0.0
+}
+
+
+def _classify_unknown_disease(disease_name: str) -> DiseaseInfo:
+    """Classify unknown consolidated disease using heuristics"""
+    disease_lower = disease_name.lower()
+    
+    # High severity keywords
+    if _HIGH_SEVERITY_PATTERN.search(disease_lower) is not None:
+        return DiseaseInfo(
+            name=disease_name,
+            type=DiseaseType.FUNGAL,
+            severity=SeverityLevel.CRITICAL,
+            impact_score=90.0,
+            spreading_rate='fast',
+            treatment_priority=5
+        )
+    
+    # Medium severity (default for most diseases)
+    return DiseaseInfo(
+        name=disease_name,
+        type=DiseaseType.FUNGAL,
+        severity=SeverityLevel.MEDIUM,
+        impact_score=50.0,
+        spreading_rate='medium',
+        treatment_priority=2
+    )
+
+
+@lru_cache(maxsize=1)
+def _load_disease_classes_cached(path_str: str, mtime: float) -> Tuple[str, ...]:
+    """Parse class names from data.yaml; keyed on mtime so edits invalidate the cache"""
+    # Imported lazily so importers that never read data.yaml skip PyYAML's import cost
+    import yaml
+    try:
+        from yaml import CSafeLoader as YamlLoader  # libyaml C parser when available
+    except ImportError:
+        from yaml import SafeLoader as YamlLoader
+    
+    with open(path_str, 'r') as f:
+        data = yaml.load(f, Loader=YamlLoader)
+    classes = tuple(data.get('names', []))
+    logger.info(f"Loaded {len(classes)} disease classes")
+    return classes
+
+
+@lru_cache(maxsize=4)
+def _build_disease_database_cached(disease_classes: Tuple[str, ...]) -> Mapping[str, DiseaseInfo]:
+    """Build the (read-only) disease database for a set of consolidated classes"""
+    disease_db = {}
+    
+    for disease_name in disease_classes:
+        # Check if we have specific info for this consolidated class
+        if disease_name in _CONSOLIDATED_DISEASE_INFO:
+            info = _CONSOLIDATED_DISEASE_INFO[disease_name]
+            disease_info = DiseaseInfo(
+                name=disease_name,
+                type=info['type'],
+                severity=info['severity'],
+                impact_score=info['impact_score'],
+                spreading_rate=info['spreading_rate'],
+                treatment_priority=info['priority']
+            )
+        else:
+            # Use heuristics for unknown consolidated classes
+            disease_info = _classify_unknown_disease(disease_name)
+        
+        disease_db[disease_name] = disease_info
+    
+    logger.info(f"Built consolidated disease database with {len(disease_db)} entries")
+    return MappingProxyType(disease_db)
 
 
 class DiseaseClassifier:
     """Classifies diseases based on dataset classes and provides severity assessment"""
     
     def __init__(self):
+        # Both are cached at module level, so repeated instantiation is cheap
         self.disease_classes = self._load_disease_classes()
         self.disease_db = self._build_disease_database()
+        
+        # Flat per-class lookups for vectorized scoring
+        self.impact_scores = {name: float(info.impact_score) for name, info in self.disease_db.items()}
+        self.treatment_priorities = {name: info.treatment_priority for name, info in self.disease_db.items()}
+        self._classification_templates = {name: info.template for name, info in self.disease_db.items()}
     
-    def _load_disease_classes(self) -> List[str]:
+    def _load_disease_classes(self) -> Tuple[str, ...]:
         """Load disease classes from data.yaml"""
         try:
             if DATA_YAML_PATH.exists():
-                with open(DATA_YAML_PATH, 'r') as f:
-                    data = yaml.safe_load(f)
-                classes = data.get('names', [])
-                logger.info(f"Loaded {len(classes)} disease classes")
-                return classes
+                return _load_disease_classes_cached(str(DATA_YAML_PATH), DATA_YAML_PATH.stat().st_mtime)
             else:
                 logger.warning("No data.yaml found, using default classes")
                 return self._get_default_classes()
@@ -64,146 +286,16 @@ class DiseaseClassifier:
             logger.error(f"Error loading disease classes: {e}")
             return self._get_default_classes()
     
-    def _get_default_classes(self) -> List[str]:
+    def _get_default_classes(self) -> Tuple[str, ...]:
         """Default consolidated disease classes"""
-        return [
+        return (
             'healthy', 'blight', 'leaf_spot', 'rust', 'mildew', 'virus_disease',
             'anthracnose', 'rot_disease', 'scab', 'pest_damage', 'bacterial_disease'
-        ]
+        )
     
-    def _build_disease_database(self) -> Dict[str, DiseaseInfo]:
+    def _build_disease_database(self) -> Mapping[str, DiseaseInfo]:
         """Build disease information database for consolidated classes"""
-        disease_db = {}
-        
-        # Define severity and characteristics for consolidated classes
-        consolidated_disease_info = {
-            'healthy': {
-                'type': DiseaseType.ENVIRONMENTAL,
-                'severity': SeverityLevel.LOW,
-                'impact_score': 0.0,
-                'priority': 1,
-                'spreading_rate': 'none'
-            },
-            'blight': {
-                'type': DiseaseType.FUNGAL,
-                'severity': SeverityLevel.HIGH,
-                'impact_score': 85.0,
-                'priority': 5,
-                'spreading_rate': 'fast'
-            },
-            'leaf_spot': {
-                'type': DiseaseType.FUNGAL,
-                'severity': SeverityLevel.MEDIUM,
-                'impact_score': 60.0,
-                'priority': 3,
-                'spreading_rate': 'medium'
-            },
-            'rust': {
-                'type': DiseaseType.FUNGAL,
-                'severity': SeverityLevel.MEDIUM,
-                'impact_score': 65.0,
-                'priority': 3,
-                'spreading_rate': 'medium'
-            },
-            'mildew': {
-                'type': DiseaseType.FUNGAL,
-                'severity': SeverityLevel.MEDIUM,
-                'impact_score': 55.0,
-                'priority': 3,
-                'spreading_rate': 'medium'
-            },
-            'virus_disease': {
-                'type': DiseaseType.VIRAL,
-                'severity': SeverityLevel.HIGH,
-                'impact_score': 80.0,
-                'priority': 4,
-                'spreading_rate': 'fast'
-            },
-            'anthracnose': {
-                'type': DiseaseType.FUNGAL,
-                'severity': SeverityLevel.MEDIUM,
-                'impact_score': 65.0,
-                'priority': 3,
-                'spreading_rate': 'medium'
-            },
-            'rot_disease': {
-                'type': DiseaseType.FUNGAL,
-                'severity': SeverityLevel.HIGH,
-                'impact_score': 75.0,
-                'priority': 4,
-                'spreading_rate': 'medium'
-            },
-            'scab': {
-                'type': DiseaseType.FUNGAL,
-                'severity': SeverityLevel.MEDIUM,
-                'impact_score': 50.0,
-                'priority': 2,
-                'spreading_rate': 'slow'
-            },
-            'pest_damage': {
-                'type': DiseaseType.PEST,
-                'severity': SeverityLevel.MEDIUM,
-                'impact_score': 55.0,
-                'priority': 3,
-                'spreading_rate': 'medium'
-            },
-            'bacterial_disease': {
-                'type': DiseaseType.BACTERIAL,
-                'severity': SeverityLevel.HIGH,
-                'impact_score': 70.0,
-                'priority': 4,
-                'spreading_rate': 'fast'
-            }
-        }
-        
-        # Build database for all disease classes
-        for disease_name in self.disease_classes:
-            disease_lower = disease_name.lower().replace('_', ' ').replace('-', ' ')
-            
-            # Check if we have specific info for this consolidated class
-            if disease_name in consolidated_disease_info:
-                info = consolidated_disease_info[disease_name]
-                disease_info = DiseaseInfo(
-                    name=disease_name,
-                    type=info['type'],
-                    severity=info['severity'],
-                    impact_score=info['impact_score'],
-                    spreading_rate=info['spreading_rate'],
-                    treatment_priority=info['priority']
-                )
-            else:
-                # Use heuristics for unknown consolidated classes
-                disease_info = self._classify_unknown_disease(disease_name)
-            
-            disease_db[disease_name] = disease_info
-        
-        logger.info(f"Built consolidated disease database with {len(disease_db)} entries")
-        return disease_db
-    
-    def _classify_unknown_disease(self, disease_name: str) -> DiseaseInfo:
-        """Classify unknown consolidated disease using heuristics"""
-        disease_lower = disease_name.lower()
-        
-        # High severity keywords
-        if any(keyword in disease_lower for keyword in ['critical', 'severe', 'wilt', 'death', 'dead']):
-            return DiseaseInfo(
-                name=disease_name,
-                type=DiseaseType.FUNGAL,
-                severity=SeverityLevel.CRITICAL,
-                impact_score=90.0,
-                spreading_rate='fast',
-                treatment_priority=5
-            )
-        
-        # Medium severity (default for most diseases)
-        return DiseaseInfo(
-            name=disease_name,
-            type=DiseaseType.FUNGAL,
-            severity=SeverityLevel.MEDIUM,
-            impact_score=50.0,
-            spreading_rate='medium',
-            treatment_priority=2
-        )
+        return _build_disease_database_cached(tuple(self.disease_classes))
 
     def get_disease_info(self, disease_name: str) -> Optional[DiseaseInfo]:
         """Get disease information"""
@@ -211,32 +303,19 @@ class DiseaseClassifier:
     
     def classify_detection(self, class_name: str, confidence: float) -> Dict:
         """Classify a detection and return comprehensive info"""
-        disease_info = self.get_disease_info(class_name)
+        template = self._classification_templates.get(class_name)
+        confidence = float(confidence)
         
-        if not disease_info:
-            return {
-                'class_name': class_name,
-                'type': 'unknown',
-                'severity': 'unknown',
-                'impact_score': float(50.0),
-                'confidence': float(confidence),
-                'treatment_priority': 2,
-                'weighted_impact': float(50.0 * confidence)
-            }
+        if template is None:
+            result = _UNKNOWN_TEMPLATE.copy()
+            result['class_name'] = class_name
+        else:
+            result = template.copy()
         
         # Adjust impact based on confidence
-        adjusted_impact = float(disease_info.impact_score * confidence)
-        
-        return {
-            'class_name': class_name,
-            'type': disease_info.type.value,
-            'severity': disease_info.severity.value,
-            'impact_score': float(disease_info.impact_score),
-            'confidence': float(confidence),
-            'treatment_priority': disease_info.treatment_priority,
-            'spreading_rate': disease_info.spreading_rate,
-            'weighted_impact': adjusted_impact
-        }
+        result['confidence'] = confidence
+        result['weighted_impact'] = result['impact_score'] * confidence
+        return result
     
     def get_treatment_recommendations(self, disease_name: str) -> List[str]:
         """Get basic treatment recommendations"""
@@ -245,34 +324,4 @@ class DiseaseClassifier:
         if not disease_info:
             return ["Consult agricultural expert for proper diagnosis"]
         
-        recommendations = []
-        
-        if disease_info.type == DiseaseType.FUNGAL:
-            recommendations.extend([
-                "Apply appropriate fungicide treatment",
-                "Improve air circulation around plants",
-                "Avoid overhead watering"
-            ])
-        elif disease_info.type == DiseaseType.BACTERIAL:
-            recommendations.extend([
-                "Remove and destroy infected plant material",
-                "Apply copper-based bactericide if available",
-                "Avoid working with wet plants"
-            ])
-        elif disease_info.type == DiseaseType.VIRAL:
-            recommendations.extend([
-                "Remove infected plants to prevent spread",
-                "Control insect vectors",
-                "Use virus-free planting material"
-            ])
-        elif disease_info.type == DiseaseType.PEST:
-            recommendations.extend([
-                "Apply appropriate insecticide or miticide",
-                "Use biological control methods if available",
-                "Monitor pest population regularly"
-            ])
-        
-        if disease_info.severity in [SeverityLevel.HIGH, SeverityLevel.CRITICAL]:
-            recommendations.insert(0, "URGENT: Take immediate action")
-        
-        return recommendations
+        return list(disease_info.recommendations)
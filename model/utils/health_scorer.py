@@ -4,16 +4,32 @@ Simplified Crop Health Scoring System
 
 import logging
 import numpy as np
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from itertools import compress, repeat
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple
+from copy import deepcopy
+from dataclasses import dataclass, replace
 
 from config import OPTIMAL_RANGES, DISEASE_IMPACT_WEIGHTS
 from .disease_classifier import DiseaseClassifier
 
 logger = logging.getLogger(__name__)
 
+# (parameter names, values, scores) for the sensor readings that were provided
+SensorScores = Tuple[Tuple[str, ...], np.ndarray, np.ndarray]
 
-@dataclass
+# C-level attribute extraction for DetectionResult lists
+_detection_fields = attrgetter('confidence', 'area', 'class_name')
+_detection_confidence = attrgetter('confidence')
+_classification_fields = attrgetter('class_name', 'confidence', 'area')
+
+# Unpacked once for the environmental recommendation checks
+_TEMP_MIN, _TEMP_MAX = OPTIMAL_RANGES['temperature']
+_HUMIDITY_MIN, _HUMIDITY_MAX = OPTIMAL_RANGES['humidity']
+_MOISTURE_MIN, _MOISTURE_MAX = OPTIMAL_RANGES['soil_moisture']
+
+
+@dataclass(slots=True)
 class DetectionResult:
     class_name: str
     confidence: float
@@ -21,7 +37,7 @@ class DetectionResult:
     area: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class SensorData:
     temperature: Optional[float] = None
     humidity: Optional[float] = None
@@ -29,8 +45,9 @@ class SensorData:
     ph: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class HealthAssessment:
+    """Assessment result; fields are native Python types (use numpy_json_default if extended with numpy values)"""
     overall_health: float
     disease_score: float
     environmental_score: float
@@ -41,21 +58,11 @@ class HealthAssessment:
     sensor_analysis: Dict
 
 
-def convert_numpy_types(obj):
-    """Convert numpy types to Python native types for JSON serialization"""
-    if isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
+def numpy_json_default(obj):
+    """json.dumps default= hook for any numpy values a caller adds to an assessment"""
+    if hasattr(obj, 'tolist'):  # numpy scalars and arrays
         return obj.tolist()
-    elif isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, tuple):
-        return tuple(convert_numpy_types(item) for item in obj)
-    return obj
+    return str(obj)
 
 
 class HealthScorer:
@@ -63,18 +70,46 @@ class HealthScorer:
     
     def __init__(self):
         self.disease_classifier = DiseaseClassifier()
+        
+        # Optimal ranges flattened into arrays for vectorized parameter scoring
+        self._param_names = tuple(OPTIMAL_RANGES)
+        self._mins = np.array([r[0] for r in OPTIMAL_RANGES.values()], dtype=np.float64)
+        self._maxs = np.array([r[1] for r in OPTIMAL_RANGES.values()], dtype=np.float64)
+        self._inv_range = 1.0 / (self._maxs - self._mins)
+        
+        # Pre-built result for the common "nothing detected, no sensors" case (copied before returning)
+        self._empty_assessment = self._assess_health([], None)
     
     def calculate_health_score(self, 
                              detections: List[DetectionResult],
                              sensor_data: Optional[SensorData] = None) -> HealthAssessment:
         """Calculate comprehensive health score"""
+        if not detections and sensor_data is None:
+            # Fresh containers so callers can't mutate the shared template
+            empty = self._empty_assessment
+            return replace(
+                empty,
+                recommendations=list(empty.recommendations),
+                detected_issues=[],
+                sensor_analysis=deepcopy(empty.sensor_analysis)
+            )
+        
+        return self._assess_health(detections, sensor_data)
+    
+    def _assess_health(self,
+                       detections: List[DetectionResult],
+                       sensor_data: Optional[SensorData]) -> HealthAssessment:
+        """Run the full scoring pipeline"""
         
         # Analyze detections
         disease_analysis = self._analyze_detections(detections)
         
+        # Score sensor parameters once; shared by the environmental score and the analysis
+        sensor_scores = self._compute_sensor_scores(sensor_data)
+        
         # Calculate scores
         disease_score = self._calculate_disease_score(disease_analysis)
-        env_score = self._calculate_environmental_score(sensor_data)
+        env_score = self._calculate_environmental_score(sensor_scores)
         
         # Calculate overall health (weighted average)
         disease_weight = 0.7
@@ -92,11 +127,10 @@ class HealthScorer:
         recommendations = self._generate_recommendations(disease_analysis, sensor_data)
         
         # Analyze sensor data
-        sensor_analysis = self._analyze_sensor_data(sensor_data)
+        sensor_analysis = self._analyze_sensor_data(sensor_scores)
         
-        # Convert all numpy types to Python types
-        classified_detections = convert_numpy_types(disease_analysis['classified_detections'])
-        sensor_analysis = convert_numpy_types(sensor_analysis)
+        # Per-detection details are only needed for the response payload
+        classified_detections = self._classify_detections(detections)
         
         return HealthAssessment(
             overall_health=float(overall_health),
@@ -110,33 +144,46 @@ class HealthScorer:
         )
     
     def _analyze_detections(self, detections: List[DetectionResult]) -> Dict:
-        """Analyze detections using disease classifier"""
-        classified_detections = []
-        total_impact = 0.0
-        max_priority = 0
-        total_area = 0.0
-        
-        for detection in detections:
-            classification = self.disease_classifier.classify_detection(
-                detection.class_name, 
-                detection.confidence
-            )
-            
-            classification['area'] = float(detection.area)
-            classified_detections.append(classification)
-            
-            total_impact += classification['weighted_impact']
-            max_priority = max(max_priority, classification['treatment_priority'])
-            total_area += detection.area
+        """Aggregate detection impact, priority and area (numeric pass only)"""
+        count = len(detections)
+        if count == 0:
+            return {
+                'detections': detections,
+                'total_impact': 0.0,
+                'max_priority': 0,
+                'affected_area': 0.0,
+                'detection_count': 0
+            }
+        
+        # Aggregate as arrays (structure of arrays) instead of per-detection accumulators
+        impact_scores = self.disease_classifier.impact_scores
+        priorities = self.disease_classifier.treatment_priorities
+        confidences, areas, names = zip(*map(_detection_fields, detections))
+        confidences = np.fromiter(confidences, dtype=np.float64, count=count)
+        areas = np.fromiter(areas, dtype=np.float64, count=count)
+        impacts = np.fromiter(map(impact_scores.get, names, repeat(50.0)), dtype=np.float64, count=count)
+        priority_values = np.fromiter(map(priorities.get, names, repeat(2)), dtype=np.int64, count=count)
         
         return {
-            'classified_detections': classified_detections,
-            'total_impact': float(total_impact),
-            'max_priority': int(max_priority),
-            'affected_area': float(total_area),
-            'detection_count': len(detections)
+            'detections': detections,
+            'total_impact': float((impacts * confidences).sum()),
+            'max_priority': int(priority_values.max()),
+            'affected_area': float(areas.sum()),
+            'detection_count': count
         }
     
+    def _classify_detections(self, detections: List[DetectionResult]) -> List[Dict]:
+        """Build the per-detection classification payload"""
+        # Bind hot callables to locals to skip attribute lookups per iteration
+        classify = self.disease_classifier.classify_detection
+        classified_detections = []
+        append = classified_detections.append
+        for class_name, confidence, area in map(_classification_fields, detections):
+            classification = classify(class_name, confidence)
+            classification['area'] = float(area)
+            append(classification)
+        return classified_detections
+    
     def _calculate_disease_score(self, disease_analysis: Dict) -> float:
         """Calculate disease score from analysis"""
         if disease_analysis['detection_count'] == 0:
@@ -156,34 +203,38 @@ class HealthScorer:
         
         return float(disease_score)
     
-    def _calculate_environmental_score(self, sensor_data: Optional[SensorData]) -> float:
+    def _calculate_environmental_score(self, sensor_scores: Optional[SensorScores]) -> float:
         """Calculate environmental score"""
-        if not sensor_data:
+        if sensor_scores is None:
             return 75.0  # Default score when no sensor data
         
-        scores = []
-        
-        for param, optimal_range in OPTIMAL_RANGES.items():
-            value = getattr(sensor_data, param, None)
-            if value is not None:
-                score = self._score_parameter(value, optimal_range)
-                scores.append(score)
-        
-        return float(np.mean(scores)) if scores else 75.0
+        scores = sensor_scores[2]
+        return float(scores.mean()) if scores.size else 75.0
     
-    def _score_parameter(self, value: float, optimal_range: tuple) -> float:
-        """Score individual parameter"""
-        min_val, max_val = optimal_range
-        range_size = max_val - min_val
-        
-        if min_val <= value <= max_val:
-            return 100.0
-        elif value < min_val:
-            deviation = (min_val - value) / range_size
-            return max(0, 100 - deviation * 100)
-        else:
-            deviation = (value - max_val) / range_size
-            return max(0, 100 - deviation * 100)
+    def _compute_sensor_scores(self, sensor_data: Optional[SensorData]) -> Optional[SensorScores]:
+        """Score all provided sensor readings in one pass: (names, values, scores)"""
+        if sensor_data is None:
+            return None
+        
+        values = self._sensor_values(sensor_data)
+        scores = self._score_parameters(values)
+        present = ~np.isnan(values)
+        names = tuple(compress(self._param_names, present))
+        return names, values[present], scores[present]
+    
+    def _sensor_values(self, sensor_data: SensorData) -> np.ndarray:
+        """Gather sensor readings in OPTIMAL_RANGES order (NaN where missing)"""
+        return np.array(
+            [np.nan if (value := getattr(sensor_data, param, None)) is None else value
+             for param in self._param_names],
+            dtype=np.float64
+        )
+    
+    def _score_parameters(self, values: np.ndarray) -> np.ndarray:
+        """Score all parameters at once: 100 inside the range, falling off linearly outside"""
+        below = np.clip((self._mins - values) * self._inv_range, 0.0, None)
+        above = np.clip((values - self._maxs) * self._inv_range, 0.0, None)
+        return np.maximum(0.0, 100.0 - (below + above) * 100.0)
     
     def _determine_risk_level(self, health_score: float, disease_analysis: Dict) -> str:
         """Determine risk level"""
@@ -212,8 +263,8 @@ class HealthScorer:
         
         # Detection confidence
         if detections:
-            avg_confidence = np.mean([d.confidence for d in detections]) * 100
-            confidence_factors.append(avg_confidence)
+            total_confidence = sum(map(_detection_confidence, detections))
+            confidence_factors.append(total_confidence / len(detections) * 100)
         else:
             confidence_factors.append(90.0)  # High confidence if no issues detected
         
@@ -226,7 +277,7 @@ class HealthScorer:
         else:
             confidence_factors.append(50.0)  # Moderate confidence without sensors
         
-        return float(np.mean(confidence_factors))
+        return float(sum(confidence_factors) / len(confidence_factors))
     
     def _generate_recommendations(self, disease_analysis: Dict, 
                                 sensor_data: Optional[SensorData]) -> List[str]:
@@ -234,9 +285,9 @@ class HealthScorer:
         recommendations = []
         
         # Disease-specific recommendations
-        for detection in disease_analysis['classified_detections'][:3]:  # Top 3 issues
+        for detection in disease_analysis['detections'][:3]:  # Top 3 issues
             disease_recs = self.disease_classifier.get_treatment_recommendations(
-                detection['class_name']
+                detection.class_name
             )
             recommendations.extend(disease_recs[:2])  # Top 2 per disease
         
@@ -249,67 +300,57 @@ class HealthScorer:
         if disease_analysis['max_priority'] >= 3:
             recommendations.append("Schedule follow-up inspection within 3-5 days")
         
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_recs = []
-        for rec in recommendations:
-            if rec not in seen:
-                seen.add(rec)
-                unique_recs.append(rec)
-        
-        return unique_recs[:8]  # Limit to 8 recommendations
+        # Remove duplicates while preserving order, limit to 8 recommendations
+        return list(dict.fromkeys(recommendations))[:8]
     
     def _get_environmental_recommendations(self, sensor_data: SensorData) -> List[str]:
         """Get environmental recommendations"""
         recommendations = []
         
-        if sensor_data.temperature is not None:
-            temp_range = OPTIMAL_RANGES['temperature']
-            if sensor_data.temperature < temp_range[0]:
+        temperature = sensor_data.temperature
+        if temperature is not None:
+            if temperature < _TEMP_MIN:
                 recommendations.append("Provide protection from cold temperatures")
-            elif sensor_data.temperature > temp_range[1]:
+            elif temperature > _TEMP_MAX:
                 recommendations.append("Provide shade or cooling measures")
         
-        if sensor_data.humidity is not None:
-            humidity_range = OPTIMAL_RANGES['humidity']
-            if sensor_data.humidity < humidity_range[0]:
+        humidity = sensor_data.humidity
+        if humidity is not None:
+            if humidity < _HUMIDITY_MIN:
                 recommendations.append("Increase humidity around plants")
-            elif sensor_data.humidity > humidity_range[1]:
+            elif humidity > _HUMIDITY_MAX:
                 recommendations.append("Improve ventilation to reduce humidity")
         
-        if sensor_data.soil_moisture is not None:
-            moisture_range = OPTIMAL_RANGES['soil_moisture']
-            if sensor_data.soil_moisture < moisture_range[0]:
+        soil_moisture = sensor_data.soil_moisture
+        if soil_moisture is not None:
+            if soil_moisture < _MOISTURE_MIN:
                 recommendations.append("Increase watering frequency")
-            elif sensor_data.soil_moisture > moisture_range[1]:
+            elif soil_moisture > _MOISTURE_MAX:
                 recommendations.append("Reduce watering to prevent root rot")
         
         return recommendations
     
-    def _analyze_sensor_data(self, sensor_data: Optional[SensorData]) -> Dict:
+    def _analyze_sensor_data(self, sensor_scores: Optional[SensorScores]) -> Dict:
         """Analyze sensor data for response"""
         analysis = {}
         
-        if not sensor_data:
+        if sensor_scores is None:
             return analysis
         
-        for param, optimal_range in OPTIMAL_RANGES.items():
-            value = getattr(sensor_data, param, None)
-            if value is not None:
-                score = self._score_parameter(value, optimal_range)
-                
-                if score >= 80:
-                    status = 'optimal'
-                elif score >= 60:
-                    status = 'acceptable'
-                else:
-                    status = 'poor'
-                
-                analysis[param] = {
-                    'value': float(value),
-                    'status': status,
-                    'score': float(score),
-                    'optimal_range': optimal_range
-                }
+        names, values, scores = sensor_scores
+        for param, value, score in zip(names, values.tolist(), scores.tolist()):
+            if score >= 80:
+                status = 'optimal'
+            elif score >= 60:
+                status = 'acceptable'
+            else:
+                status = 'poor'
+            
+            analysis[param] = {
+                'value': value,
+                'status': status,
+                'score': score,
+                'optimal_range': OPTIMAL_RANGES[param]
+            }
         
         return analysis
@@ -0,0 +1,36 @@
+"""
+Shared HTTP session factory for external API clients
+"""
+
+import json
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def create_session(pool_size: int = 16, retries: int = 2, backoff_factor: float = 0.3) -> requests.Session:
+    """Create a requests session with keep-alive connection pooling and retries"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=backoff_factor)
+    )
+    session.mount("https://", adapter)
+    session.headers.update({'Accept-Encoding': 'gzip'})
+    return session
+
+
+def loads_json(content: bytes) -> Any:
+    """Parse a JSON response body, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
@@ -2,17 +2,80 @@
 PlantNet API Integration for Plant Species Identification
 """
 
+import asyncio
 import requests
 from io import BytesIO
 from PIL import Image
 import logging
-from typing import Dict, List, Optional, Union
+from typing import BinaryIO, Dict, List, Optional, Union
+from operator import itemgetter
 from pathlib import Path
 
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    from requests_toolbelt import MultipartEncoder
+    TOOLBELT_AVAILABLE = True
+except ImportError:
+    TOOLBELT_AVAILABLE = False
+
 from config import PLANTNET_API_KEY, PLANTNET_BASE_URL, PLANTNET_PROJECT, PLANTNET_ORGANS
+from .http_session import create_session, loads_json
 
 logger = logging.getLogger(__name__)
 
+# Longest image edge uploaded to PlantNet; larger PIL images are downscaled first
+MAX_UPLOAD_EDGE = 1280
+
+# Start-of-image marker of every JPEG file
+JPEG_MAGIC = b'\xff\xd8\xff'
+
+# Prepared upload: encoded bytes, or an open binary file streamed from disk
+ImageData = Union[bytes, BinaryIO]
+
+
+def _build_fallback_result(project: str) -> Dict:
+    """Create the fallback result returned when the API fails"""
+    return {
+        'success': False,
+        'species_count': 0,
+        'best_match': {
+            'scientific_name': 'Unknown species',
+            'common_names': ['Unknown plant'],
+            'primary_common_name': 'Unknown plant',
+            'family': 'Unknown',
+            'genus': 'Unknown',
+            'score': 0.0,
+            'confidence': 'very_low'
+        },
+        'all_results': [],
+        'query_info': {
+            'project': project,
+            'language': 'en',
+            'remaining_identification_requests': 0,
+            'error': 'API call failed - using fallback'
+        }
+    }
+
+
+_get_score = itemgetter('score')
+
+# Identifications between project statistics resets, so transient outages are forgotten
+PROJECT_STATS_RESET_INTERVAL = 100
+
+
+def _taxon_name(info: Union[Dict, str]) -> str:
+    """Name of a family/genus entry, which PlantNet returns as a dict or a plain string"""
+    if isinstance(info, dict):
+        return info.get('scientificNameWithoutAuthor', '') or info.get('scientificName', '')
+    if isinstance(info, str):
+        return info
+    return ''
+
 
 class PlantNetAPI:
     """Interface for PlantNet plant identification API"""
@@ -24,6 +87,18 @@ class PlantNetAPI:
         
         # Available projects (ordered by preference)
         self.available_projects = ["all", "weurope", "useful", "k-world-flora", "the-plant-list"]
+        self._preferred_projects = tuple(self.available_projects)
+        
+        # Recent [success, failure] counts per project, used to try reliable projects first
+        self._project_stats = {project: [0, 0] for project in self.available_projects}
+        self._identifications_since_reset = 0
+        
+        # Keep-alive session so retries across projects reuse the TLS connection
+        self.session = create_session()
+        
+        # Pooled aiohttp session, bound to the event loop that created it
+        self._session = None
+        self._session_loop = None
         
         if not self.api_key:
             logger.warning("PlantNet API key not provided. Plant identification will not work.")
@@ -40,6 +115,7 @@ class PlantNetAPI:
             logger.error("PlantNet API key not configured")
             return self._create_fallback_result()
         
+        image_data = None
         try:
             # Prepare image data
             image_data = self._prepare_image(image)
@@ -50,7 +126,7 @@ class PlantNetAPI:
             if organs is None:
                 organs = ["auto"]
             
-            # Try the working approach directly
+            # Streamed upload, one project after another (identify_plant_async queries concurrently)
             return self._identify_with_working_approach(image_data, organs)
                 
         except requests.exceptions.Timeout:
@@ -62,98 +138,177 @@ class PlantNetAPI:
         except Exception as e:
             logger.error(f"Error calling PlantNet API: {e}")
             return self._create_fallback_result()
+        finally:
+            self._release_image_data(image_data)
+    
+    async def identify_plant_async(self,
+                                   image: Union[str, Path, Image.Image, bytes],
+                                   organs: List[str] = None,
+                                   **kwargs) -> Optional[Dict]:
+        """Async variant of identify_plant for callers already running an event loop"""
+        if not AIOHTTP_AVAILABLE:
+            return await asyncio.to_thread(self.identify_plant, image, organs, **kwargs)
+        
+        if not self.api_key:
+            logger.error("PlantNet API key not configured")
+            return self._create_fallback_result()
+        
+        image_data = None
+        try:
+            image_data = self._prepare_image(image)
+            if not image_data:
+                return self._create_fallback_result()
+            
+            # Concurrent requests share one in-memory buffer
+            return await self._identify_async(self._read_image_data(image_data), organs or ["auto"])
+        except Exception as e:
+            logger.error(f"Error calling PlantNet API: {e}")
+            return self._create_fallback_result()
+        finally:
+            self._release_image_data(image_data)
+    
+    async def _identify_async(self, image_data: bytes, organs: List[str]) -> Dict:
+        """Query the best-ranked project first, then the remaining projects concurrently if it fails"""
+        session = self._get_session()
+        organ = organs[0] if organs else 'auto'
+        
+        # Every request counts against the PlantNet quota, so only fan out on failure
+        first, *fallbacks = self._ordered_projects()
+        result = await self._post_project(session, first, image_data, organ)
+        if result is None and fallbacks:
+            results = await asyncio.gather(
+                *(self._post_project(session, project, image_data, organ) for project in fallbacks)
+            )
+            # Ranked order, not arrival order, picks between successful projects
+            result = next((r for r in results if r is not None), None)
+        
+        if result is not None:
+            return self._process_v2_results(result)
+        
+        logger.error("All projects failed")
+        return self._create_fallback_result()
+    
+    async def _post_project(self, session, project: str, image_data: bytes, organ: str) -> Optional[Dict]:
+        """POST the image to one project; returns the JSON body on success, else None"""
+        url = f"{self.base_url}/identify/{project}"
+        
+        form = aiohttp.FormData()
+        form.add_field('organs', organ)
+        form.add_field('images', BytesIO(image_data), filename='image.jpg', content_type='image/jpeg')
+        
+        try:
+            logger.info(f"Trying minimal request for project {project}")
+            async with session.post(url, params={'api-key': self.api_key}, data=form) as response:
+                if response.status == 200:
+                    logger.info(f"Success with project {project}")
+                    result = loads_json(await response.read())
+                    self._record_project_result(project, True)
+                    return result
+                logger.debug(f"Project {project} failed with status {response.status}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Request error for {project}: {e}")
+        
+        self._record_project_result(project, False)
+        return None
+    
+    def _get_session(self):
+        """Return the pooled aiohttp session for the running loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+            self._session_loop = loop
+        return self._session
+    
+    async def close_async(self):
+        """Close the pooled aiohttp session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
     
-    def _identify_with_working_approach(self, image_data: bytes, organs: List[str]) -> Optional[Dict]:
+    def close(self):
+        """Release pooled HTTP connections"""
+        self.session.close()
+    
+    def __del__(self):
+        session = getattr(self, 'session', None)
+        if session is not None:
+            session.close()
+    
+    def _identify_with_working_approach(self, image_data: ImageData, organs: List[str]) -> Optional[Dict]:
         """Use the minimal approach that we know works"""
         
-        for project in self.available_projects:
+        for project in self._ordered_projects():
             try:
                 url = f"{self.base_url}/identify/{project}"
                 
                 # Minimal working parameters
                 params = {'api-key': self.api_key}
-                files = [('images', ('image.jpg', image_data, 'image/jpeg'))]
-                data = {'organs': organs[0] if organs else 'auto'}
+                organ = organs[0] if organs else 'auto'
+                image_field = ('image.jpg', self._rewind_image_data(image_data), 'image/jpeg')
                 
                 logger.info(f"Trying minimal request for project {project}")
                 
-                response = requests.post(url, params=params, files=files, data=data, timeout=30)
+                if TOOLBELT_AVAILABLE:
+                    # Stream the multipart body as the socket drains instead of building it in memory
+                    encoder = MultipartEncoder(fields={'organs': organ, 'images': image_field})
+                    response = self.session.post(url, params=params, data=encoder,
+                                                 headers={'Content-Type': encoder.content_type}, timeout=30)
+                else:
+                    response = self.session.post(url, params=params, files=[('images', image_field)],
+                                                 data={'organs': organ}, timeout=30)
                 
                 if response.status_code == 200:
-                    result = response.json()
+                    result = loads_json(response.content)
                     logger.info(f"Success with project {project}")
+                    self._record_project_result(project, True)
                     return self._process_v2_results(result)
                 else:
                     logger.debug(f"Project {project} failed with status {response.status_code}")
+                    self._record_project_result(project, False)
                     
             except Exception as e:
                 logger.debug(f"Request error for {project}: {e}")
+                self._record_project_result(project, False)
                 continue
         
         logger.error("All projects failed")
         return self._create_fallback_result()
     
+    def _ordered_projects(self) -> List[str]:
+        """Return projects sorted by recent success rate, keeping preference order on ties"""
+        self._identifications_since_reset += 1
+        if self._identifications_since_reset > PROJECT_STATS_RESET_INTERVAL:
+            self._project_stats = {project: [0, 0] for project in self._preferred_projects}
+            self._identifications_since_reset = 1
+        
+        stats = self._project_stats
+        ordered = sorted(
+            self._preferred_projects,
+            key=lambda project: -stats[project][0] / (stats[project][0] + stats[project][1] + 1)
+        )
+        if ordered != self.available_projects:
+            logger.debug(f"Reordered PlantNet projects: {ordered}")
+            self.available_projects = ordered
+        return ordered
+    
+    def _record_project_result(self, project: str, success: bool):
+        """Count a success or failure for a project"""
+        self._project_stats[project][0 if success else 1] += 1
+    
+    def _create_fallback_result(self) -> Dict:
+        """Create a fallback result when API fails"""
+        return _build_fallback_result(self.project)
+    
     def _process_v2_results(self, api_response: Dict) -> Dict:
         """Process v2 API response with the actual structure"""
-        results = []
-        
         # Handle v2 API response structure
-        raw_results = api_response.get('results', [])
-        
-        for item in raw_results:
-            species_info = item.get('species', {})
-            
-            # Extract species information
-            scientific_name = (
-                species_info.get('scientificNameWithoutAuthor', '') or
-                species_info.get('scientificName', '') or
-                'Unknown species'
-            )
-            
-            # Handle common names
-            common_names = species_info.get('commonNames', [])
-            if isinstance(common_names, str):
-                common_names = [common_names]
-            elif not isinstance(common_names, list):
-                common_names = []
-            
-            # Extract family and genus info
-            family_info = species_info.get('family', {})
-            family_name = ''
-            if isinstance(family_info, dict):
-                family_name = family_info.get('scientificNameWithoutAuthor', '') or family_info.get('scientificName', '')
-            elif isinstance(family_info, str):
-                family_name = family_info
-            
-            genus_info = species_info.get('genus', {})
-            genus_name = ''
-            if isinstance(genus_info, dict):
-                genus_name = genus_info.get('scientificNameWithoutAuthor', '') or genus_info.get('scientificName', '')
-            elif isinstance(genus_info, str):
-                genus_name = genus_info
-            
-            # Get score
-            score = float(item.get('score', 0.0))
-            
-            result = {
-                'scientific_name': scientific_name,
-                'common_names': common_names,
-                'family': family_name,
-                'genus': genus_name,
-                'score': score,
-                'confidence': self._calculate_confidence(score)
-            }
-            
-            # Get the best common name
-            if result['common_names']:
-                result['primary_common_name'] = result['common_names'][0]
-            else:
-                result['primary_common_name'] = result['scientific_name']
-            
-            results.append(result)
+        results = [self._build_result(item) for item in api_response.get('results', [])]
         
         # Sort by score (highest first)
-        results.sort(key=lambda x: x['score'], reverse=True)
+        results.sort(key=_get_score, reverse=True)
         
         # Build response in our standard format
         processed_response = {
@@ -177,44 +332,59 @@ class PlantNetAPI:
         
         return processed_response
     
-    def _create_fallback_result(self) -> Dict:
-        """Create a fallback result when API fails"""
+    def _build_result(self, item: Dict) -> Dict:
+        """Convert one v2 result item to our standard species format"""
+        species_info = item.get('species', {})
+        get = species_info.get
+        
+        # Extract species information
+        scientific_name = get('scientificNameWithoutAuthor', '') or get('scientificName', '') or 'Unknown species'
+        
+        # Handle common names
+        common_names = get('commonNames', [])
+        if isinstance(common_names, str):
+            common_names = [common_names]
+        elif not isinstance(common_names, list):
+            common_names = []
+        
+        score = float(item.get('score', 0.0))
+        
         return {
-            'success': False,
-            'species_count': 0,
-            'best_match': {
-                'scientific_name': 'Unknown species',
-                'common_names': ['Unknown plant'],
-                'primary_common_name': 'Unknown plant',
-                'family': 'Unknown',
-                'genus': 'Unknown',
-                'score': 0.0,
-                'confidence': 'very_low'
-            },
-            'all_results': [],
-            'query_info': {
-                'project': self.project,
-                'language': 'en',
-                'remaining_identification_requests': 0,
-                'error': 'API call failed - using fallback'
-            }
+            'scientific_name': scientific_name,
+            'common_names': common_names,
+            'family': _taxon_name(get('family', {})),
+            'genus': _taxon_name(get('genus', {})),
+            'score': score,
+            'confidence': self._calculate_confidence(score),
+            # Get the best common name
+            'primary_common_name': common_names[0] if common_names else scientific_name
         }
     
-    def _prepare_image(self, image: Union[str, Path, Image.Image, bytes]) -> Optional[bytes]:
-        """Convert various image inputs to bytes"""
+    def _prepare_image(self, image: Union[str, Path, Image.Image, bytes]) -> Optional[ImageData]:
+        """Convert various image inputs to bytes or an open file for streaming upload"""
         try:
-            if isinstance(image, (str, Path)):
-                # File path
-                with open(image, 'rb') as f:
-                    return f.read()
+            if isinstance(image, bytes):
+                # Already encoded (JPEG or otherwise) - upload as is
+                return image
+            elif isinstance(image, (str, Path)):
+                # File path - streamed by requests instead of read into memory
+                return open(image, 'rb')
             elif isinstance(image, Image.Image):
-                # PIL Image
+                # PIL Image decoded from a small enough JPEG - reuse the source bytes
+                if max(image.size) <= MAX_UPLOAD_EDGE:
+                    source = self._source_jpeg_bytes(image)
+                    if source:
+                        return source
+                
+                # Otherwise downscale to PlantNet's useful size before encoding
+                if max(image.size) > MAX_UPLOAD_EDGE:
+                    image = image.copy()
+                    image.thumbnail((MAX_UPLOAD_EDGE, MAX_UPLOAD_EDGE), Image.Resampling.LANCZOS)
+                if image.mode != 'RGB':
+                    image = image.convert('RGB')
                 buffer = BytesIO()
-                image.save(buffer, format='JPEG', quality=85)
+                image.save(buffer, format='JPEG', quality=85, optimize=False, progressive=False)
                 return buffer.getvalue()
-            elif isinstance(image, bytes):
-                # Already bytes
-                return image
             else:
                 logger.error(f"Unsupported image type: {type(image)}")
                 return None
@@ -222,6 +392,50 @@ class PlantNetAPI:
             logger.error(f"Error preparing image: {e}")
             return None
     
+    @staticmethod
+    def _source_jpeg_bytes(image: Image.Image) -> Optional[bytes]:
+        """Return the original JPEG bytes of an unmodified opened image if its source is still readable"""
+        fp = getattr(image, 'fp', None)
+        # Pending tiles mean the pixels were never loaded, so nothing can have edited them in place
+        if image.format != 'JPEG' or not image.tile or fp is None or getattr(fp, 'closed', False):
+            return None
+        try:
+            position = fp.tell()
+        except (AttributeError, OSError, ValueError):
+            return None
+        try:
+            fp.seek(0)
+            data = fp.read()
+        except (AttributeError, OSError, ValueError):
+            data = None
+        try:
+            # Leave the caller's stream where PIL expects it
+            fp.seek(position)
+        except (AttributeError, OSError, ValueError):
+            return None
+        return data if data and data[:3] == JPEG_MAGIC else None
+    
+    @staticmethod
+    def _read_image_data(image_data: ImageData) -> bytes:
+        """Materialize prepared image data as bytes"""
+        if isinstance(image_data, bytes):
+            return image_data
+        image_data.seek(0)
+        return image_data.read()
+    
+    @staticmethod
+    def _rewind_image_data(image_data: ImageData) -> ImageData:
+        """Rewind a file upload so it can be re-sent to the next project"""
+        if not isinstance(image_data, bytes):
+            image_data.seek(0)
+        return image_data
+    
+    @staticmethod
+    def _release_image_data(image_data: Optional[ImageData]) -> None:
+        """Close a file opened by _prepare_image"""
+        if image_data is not None and not isinstance(image_data, bytes):
+            image_data.close()
+    
     def _calculate_confidence(self, score: float) -> str:
         """Convert numeric score to confidence level"""
         if score >= 0.7:
@@ -268,7 +482,7 @@ def test_plantnet_integration():
         params = {'api-key': api.api_key}
         data = {'organs': 'auto'}
         
-        response = requests.post(test_url, params=params, files=files, data=data, timeout=10)
+        response = api.session.post(test_url, params=params, files=files, data=data, timeout=10)
         
         print(f"Test result: {response.status_code}")
         
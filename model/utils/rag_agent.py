@@ -2,17 +2,145 @@
 Simplified RAG Agent for Agricultural Advice
 """
 
+import asyncio
+import hashlib
 import logging
-import requests
 import os
-from typing import Dict, List
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
 import re
 
-from config import SERPAPI_KEY, OPENAI_API_KEY, HUGGINGFACE_API_KEY
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+from config import (SERPAPI_KEY, OPENAI_API_KEY, HUGGINGFACE_API_KEY,
+                    LLM_CACHE_DIR, LLM_CACHE_SIZE_LIMIT, LLM_CACHE_EXPIRE)
+from .http_session import create_session, loads_json
 
 logger = logging.getLogger(__name__)
 
 
+HUGGINGFACE_API_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.1"
+
+# Known disease spellings (spaces, underscores or nothing between words)
+_DISEASE_RE = re.compile(
+    r'(?P<early>early[\s_]?blight)|(?P<late>late[\s_]?blight)|(?P<bact>bacterial[\s_]?spot)'
+    r'|(?P<pm>powdery[\s_]?mildew)|(?P<sm>spider[\s_]?mite)',
+    re.IGNORECASE
+)
+_GROUP_MAP = {
+    'early': 'early_blight',
+    'late': 'late_blight',
+    'bact': 'bacterial_spot',
+    'pm': 'powdery_mildew',
+    'sm': 'spider_mite'
+}
+_WS_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=512)
+def _simplify_disease_name(disease_name: str) -> str:
+    """Simplify disease name for knowledge base lookup"""
+    # Map variations
+    match = _DISEASE_RE.search(disease_name)
+    if match:
+        return _GROUP_MAP[match.lastgroup]
+    
+    # Remove common suffixes and normalize
+    return _WS_RE.sub('_', disease_name.lower().replace('_', ' ').strip())
+
+
+def _format_advice(raw_advice: str) -> str:
+    """Format advice text for better presentation"""
+    lines = [line.strip() for line in raw_advice.strip().split('\n') if line.strip()]
+    return '\n'.join(lines)
+
+
+# Knowledge base for common diseases
+_KB_RAW = MappingProxyType({
+    'early_blight': """
+    Early blight is a common fungal disease affecting tomatoes and potatoes.
+    Symptoms: Dark spots with concentric rings on leaves, yellowing.
+    Treatment: Apply fungicide, improve air circulation, avoid overhead watering.
+    Prevention: Use resistant varieties, crop rotation, proper spacing.
+    """,
+    
+    'late_blight': """
+    Late blight is a serious disease that can destroy crops quickly.
+    Symptoms: Water-soaked spots on leaves, white mold on undersides.
+    Treatment: URGENT - Apply copper or mancozeb fungicide immediately.
+    Prevention: Avoid wet conditions, destroy infected plants, use resistant varieties.
+    """,
+    
+    'bacterial_spot': """
+    Bacterial spot affects tomatoes and peppers.
+    Symptoms: Small dark spots on leaves and fruits.
+    Treatment: Apply copper-based bactericide, remove infected material.
+    Prevention: Use disease-free seeds, avoid overhead watering, good sanitation.
+    """,
+    
+    'powdery_mildew': """
+    Powdery mildew appears as white powdery coating on leaves.
+    Symptoms: White powder on leaf surfaces, stunted growth.
+    Treatment: Apply sulfur or potassium bicarbonate spray.
+    Prevention: Good air circulation, avoid overcrowding, resistant varieties.
+    """,
+    
+    'spider_mite': """
+    Spider mites are tiny pests that cause stippling on leaves.
+    Symptoms: Fine webbing, yellow stippling, leaf bronzing.
+    Treatment: Apply miticide, increase humidity, release beneficial insects.
+    Prevention: Avoid water stress, maintain humidity, regular monitoring.
+    """
+})
+
+# Knowledge base advice, formatted once at import
+_KB_FORMATTED = MappingProxyType({name: _format_advice(advice) for name, advice in _KB_RAW.items()})
+
+
+def _llm_prompt(disease_name: str) -> str:
+    """Build the advice prompt for a disease"""
+    return f"""Provide practical farming advice for {disease_name}. Include:
+1. Symptoms to identify
+2. Treatment options
+3. Prevention methods
+Keep it simple and actionable for farmers."""
+
+
+def _huggingface_payload(prompt: str) -> Dict:
+    """Build the HuggingFace inference request body"""
+    return {
+        "inputs": f"[INST] {prompt} [/INST]",
+        "parameters": {
+            "max_new_tokens": 300,
+            "temperature": 0.3,
+            "return_full_text": False
+        }
+    }
+
+
+def _parse_huggingface_response(content: bytes) -> str:
+    """Extract the generated text from a HuggingFace response body"""
+    result = loads_json(content)
+    if isinstance(result, list) and len(result) > 0:
+        return result[0].get("generated_text", "").strip()
+    return ""
+
+
+# Pending LLM advice in a batch: (result index, disease name, prompt, cache key)
+PendingAdvice = Tuple[int, str, str, str]
+
+
 class SimpleRAGAgent:
     """Simplified RAG agent for disease advice"""
     
@@ -21,47 +149,21 @@ class SimpleRAGAgent:
         self.openai_key = OPENAI_API_KEY
         self.huggingface_key = HUGGINGFACE_API_KEY
         
+        # Keep-alive session reused across LLM calls
+        self.session = create_session()
+        
+        # HTTP/2 client for async LLM calls, created inside the running loop
+        self._http = None
+        self._http_loop = None
+        
+        # LLM responses keyed by prompt hash; on disk when diskcache is installed
+        if DISKCACHE_AVAILABLE:
+            self._llm_cache = diskcache.Cache(str(LLM_CACHE_DIR), size_limit=LLM_CACHE_SIZE_LIMIT)
+        else:
+            self._llm_cache = {}
+        
         # Knowledge base for common diseases
-        self.knowledge_base = self._build_knowledge_base()
-    
-    def _build_knowledge_base(self) -> Dict[str, str]:
-        """Build basic knowledge base for common diseases"""
-        return {
-            'early_blight': """
-            Early blight is a common fungal disease affecting tomatoes and potatoes.
-            Symptoms: Dark spots with concentric rings on leaves, yellowing.
-            Treatment: Apply fungicide, improve air circulation, avoid overhead watering.
-            Prevention: Use resistant varieties, crop rotation, proper spacing.
-            """,
-            
-            'late_blight': """
-            Late blight is a serious disease that can destroy crops quickly.
-            Symptoms: Water-soaked spots on leaves, white mold on undersides.
-            Treatment: URGENT - Apply copper or mancozeb fungicide immediately.
-            Prevention: Avoid wet conditions, destroy infected plants, use resistant varieties.
-            """,
-            
-            'bacterial_spot': """
-            Bacterial spot affects tomatoes and peppers.
-            Symptoms: Small dark spots on leaves and fruits.
-            Treatment: Apply copper-based bactericide, remove infected material.
-            Prevention: Use disease-free seeds, avoid overhead watering, good sanitation.
-            """,
-            
-            'powdery_mildew': """
-            Powdery mildew appears as white powdery coating on leaves.
-            Symptoms: White powder on leaf surfaces, stunted growth.
-            Treatment: Apply sulfur or potassium bicarbonate spray.
-            Prevention: Good air circulation, avoid overcrowding, resistant varieties.
-            """,
-            
-            'spider_mite': """
-            Spider mites are tiny pests that cause stippling on leaves.
-            Symptoms: Fine webbing, yellow stippling, leaf bronzing.
-            Treatment: Apply miticide, increase humidity, release beneficial insects.
-            Prevention: Avoid water stress, maintain humidity, regular monitoring.
-            """
-        }
+        self.knowledge_base = _KB_FORMATTED
     
     def get_disease_advice(self, disease_name: str) -> Dict:
         """Get advice for a specific disease"""
@@ -70,10 +172,9 @@ class SimpleRAGAgent:
             simplified_name = self._simplify_disease_name(disease_name)
             
             if simplified_name in self.knowledge_base:
-                advice = self.knowledge_base[simplified_name]
                 return {
                     'disease_name': disease_name,
-                    'summary': self._format_advice(advice),
+                    'summary': self.knowledge_base[simplified_name],
                     'confidence': 'high',
                     'source': 'local_knowledge'
                 }
@@ -89,82 +190,208 @@ class SimpleRAGAgent:
             logger.error(f"Error getting disease advice: {e}")
             return self._get_generic_advice(disease_name)
     
+    async def get_disease_advice_async(self, disease_name: str) -> Dict:
+        """Get advice without blocking the event loop on LLM calls"""
+        # Knowledge base hits need no I/O, so answer them inline
+        if self._simplify_disease_name(disease_name) in self.knowledge_base or not self.huggingface_key:
+            return self.get_disease_advice(disease_name)
+        
+        if HTTPX_AVAILABLE:
+            return await self._get_llm_advice_async(disease_name)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_disease_advice, disease_name)
+    
+    def get_disease_advice_batch(self, disease_names: List[str]) -> List[Dict]:
+        """Get advice for several diseases, querying the LLM only for uncached, non-KB names"""
+        results = [None] * len(disease_names)
+        try:
+            pending = self._plan_advice_batch(disease_names, results)
+            if pending:
+                # The TGI-backed endpoint takes one prompt string per request
+                responses = [self._call_huggingface_api(prompt) for _, _, prompt, _ in pending]
+                self._finish_advice_batch(pending, responses, results)
+        except Exception as e:
+            logger.error(f"Error getting batch disease advice: {e}")
+        
+        return [result or self._get_generic_advice(name) for result, name in zip(results, disease_names)]
+    
+    async def get_disease_advice_batch_async(self, disease_names: List[str]) -> List[Dict]:
+        """Get advice for several diseases without blocking the event loop"""
+        if not HTTPX_AVAILABLE:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.get_disease_advice_batch, disease_names)
+        
+        results = [None] * len(disease_names)
+        try:
+            pending = self._plan_advice_batch(disease_names, results)
+            if pending:
+                # One string prompt per request, multiplexed over the shared HTTP/2 client
+                responses = await asyncio.gather(
+                    *(self._call_huggingface_api_async(prompt) for _, _, prompt, _ in pending)
+                )
+                self._finish_advice_batch(pending, responses, results)
+        except Exception as e:
+            logger.error(f"Error getting batch disease advice: {e}")
+        
+        return [result or self._get_generic_advice(name) for result, name in zip(results, disease_names)]
+    
+    def _plan_advice_batch(self, disease_names: List[str], results: List[Optional[Dict]]) -> List[PendingAdvice]:
+        """Fill in advice that needs no LLM call and return the names still to query"""
+        pending = []
+        for index, disease_name in enumerate(disease_names):
+            # Knowledge base hits and keyless setups never reach the LLM
+            if not self.huggingface_key or self._simplify_disease_name(disease_name) in self.knowledge_base:
+                results[index] = self.get_disease_advice(disease_name)
+                continue
+            
+            # Reuse a previous answer for the same prompt
+            prompt = _llm_prompt(disease_name)
+            key = hashlib.sha1(prompt.encode()).hexdigest()
+            response = self._llm_cache.get(key)
+            if response:
+                results[index] = self._llm_advice(disease_name, response)
+            else:
+                pending.append((index, disease_name, prompt, key))
+        
+        return pending
+    
+    def _finish_advice_batch(self, pending: List[PendingAdvice], responses: List[str],
+                             results: List[Optional[Dict]]):
+        """Store batched LLM responses as advice results"""
+        for (index, disease_name, _, key), response in zip(pending, responses):
+            if response:
+                self._store_llm_response(key, response)
+                results[index] = self._llm_advice(disease_name, response)
+    
     def _simplify_disease_name(self, disease_name: str) -> str:
         """Simplify disease name for knowledge base lookup"""
-        # Remove common suffixes and normalize
-        simplified = disease_name.lower().replace('_', ' ')
-        simplified = re.sub(r'\s+', '_', simplified.strip())
-        
-        # Map variations
-        if 'early blight' in simplified or 'earlyblight' in simplified:
-            return 'early_blight'
-        elif 'late blight' in simplified or 'lateblight' in simplified:
-            return 'late_blight'
-        elif 'bacterial spot' in simplified or 'bacterialspot' in simplified:
-            return 'bacterial_spot'
-        elif 'powdery mildew' in simplified:
-            return 'powdery_mildew'
-        elif 'spider mite' in simplified:
-            return 'spider_mite'
-        
-        return simplified
-    
-    def _format_advice(self, raw_advice: str) -> str:
-        """Format advice text for better presentation"""
-        lines = [line.strip() for line in raw_advice.strip().split('\n') if line.strip()]
-        return '\n'.join(lines)
+        return _simplify_disease_name(disease_name)
     
     def _get_llm_advice(self, disease_name: str) -> Dict:
         """Get advice using LLM"""
         try:
-            prompt = f"""Provide practical farming advice for {disease_name}. Include:
-1. Symptoms to identify
-2. Treatment options
-3. Prevention methods
-Keep it simple and actionable for farmers."""
-
-            # Try HuggingFace Mistral
-            response = self._call_huggingface_api(prompt)
+            prompt = _llm_prompt(disease_name)
+            
+            # Reuse a previous answer for the same prompt
+            key = hashlib.sha1(prompt.encode()).hexdigest()
+            response = self._llm_cache.get(key)
+            
+            if not response:
+                # Try HuggingFace Mistral
+                response = self._call_huggingface_api(prompt)
+                if response:
+                    self._store_llm_response(key, response)
+            
             if response:
-                return {
-                    'disease_name': disease_name,
-                    'summary': response,
-                    'confidence': 'medium',
-                    'source': 'llm_generated'
-                }
+                return self._llm_advice(disease_name, response)
             
         except Exception as e:
             logger.error(f"LLM advice generation failed: {e}")
         
         return self._get_generic_advice(disease_name)
     
+    async def _get_llm_advice_async(self, disease_name: str) -> Dict:
+        """Get advice using LLM without blocking the event loop"""
+        try:
+            prompt = _llm_prompt(disease_name)
+            
+            # Reuse a previous answer for the same prompt
+            key = hashlib.sha1(prompt.encode()).hexdigest()
+            response = self._llm_cache.get(key)
+            
+            if not response:
+                # Try HuggingFace Mistral
+                response = await self._call_huggingface_api_async(prompt)
+                if response:
+                    self._store_llm_response(key, response)
+            
+            if response:
+                return self._llm_advice(disease_name, response)
+            
+        except Exception as e:
+            logger.error(f"LLM advice generation failed: {e}")
+        
+        return self._get_generic_advice(disease_name)
+    
+    @staticmethod
+    def _llm_advice(disease_name: str, response: str) -> Dict:
+        """Wrap LLM output as an advice result"""
+        return {
+            'disease_name': disease_name,
+            'summary': response,
+            'confidence': 'medium',
+            'source': 'llm_generated'
+        }
+    
+    def _store_llm_response(self, key: str, response: str):
+        """Cache an LLM response"""
+        if DISKCACHE_AVAILABLE:
+            self._llm_cache.set(key, response, expire=LLM_CACHE_EXPIRE)
+        else:
+            self._llm_cache[key] = response
+    
     def _call_huggingface_api(self, prompt: str) -> str:
         """Call HuggingFace API"""
         try:
-            api_url = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.1"
             headers = {"Authorization": f"Bearer {self.huggingface_key}"}
+            response = self.session.post(HUGGINGFACE_API_URL, headers=headers,
+                                         json=_huggingface_payload(prompt), timeout=30)
             
-            payload = {
-                "inputs": f"[INST] {prompt} [/INST]",
-                "parameters": {
-                    "max_new_tokens": 300,
-                    "temperature": 0.3,
-                    "return_full_text": False
-                }
-            }
+            if response.status_code == 200:
+                return _parse_huggingface_response(response.content)
             
-            response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+        except Exception as e:
+            logger.error(f"HuggingFace API call failed: {e}")
+        
+        return ""
+    
+    async def _call_huggingface_api_async(self, prompt: str) -> str:
+        """Call HuggingFace API over the shared HTTP/2 client"""
+        try:
+            headers = {"Authorization": f"Bearer {self.huggingface_key}"}
+            response = await self._get_http_client().post(HUGGINGFACE_API_URL, headers=headers,
+                                                          json=_huggingface_payload(prompt))
             
             if response.status_code == 200:
-                result = response.json()
-                if isinstance(result, list) and len(result) > 0:
-                    return result[0].get("generated_text", "").strip()
+                return _parse_huggingface_response(response.content)
             
         except Exception as e:
             logger.error(f"HuggingFace API call failed: {e}")
         
         return ""
     
+    def _get_http_client(self):
+        """Return the httpx client for the running loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._http_loop is not loop:
+            limits = httpx.Limits(max_keepalive_connections=8)
+            try:
+                self._http = httpx.AsyncClient(http2=True, timeout=30, limits=limits)
+            except ImportError:
+                # HTTP/2 needs the optional h2 package
+                self._http = httpx.AsyncClient(timeout=30, limits=limits)
+            self._http_loop = loop
+        return self._http
+    
+    async def close_async(self):
+        """Close the async HTTP client"""
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+        self._http_loop = None
+    
+    def close(self):
+        """Release pooled HTTP connections and the LLM cache"""
+        self.session.close()
+        if DISKCACHE_AVAILABLE:
+            self._llm_cache.close()
+    
+    def __del__(self):
+        session = getattr(self, 'session', None)
+        if session is not None:
+            session.close()
+    
     def _get_generic_advice(self, disease_name: str) -> Dict:
         """Provide generic advice for unknown diseases"""
         generic_advice = f"""